@@ -0,0 +1,201 @@
+"""
+AstronomyAPI helpers: Basic-auth headers and cached star-chart, planetary-position
+and moon-phase requests.
+"""
+import base64
+from types import MappingProxyType
+
+import orjson
+import streamlit as st
+from streamlit.errors import StreamlitSecretNotFoundError
+
+from http_client import http
+
+__all__ = [
+    "CONSTELLATION_IDS",
+    "CONSTELLATION_NAMES",
+    "MOON_IMAGE_FORMATS",
+    "MOON_STYLES",
+    "MOON_BACKGROUND_STYLES",
+    "MOON_ORIENTATIONS",
+    "quantize_coord",
+    "fetch_star_chart",
+    "fetch_positions",
+    "fetch_moon_phase",
+    "fetch_image",
+]
+
+ASTRONOMY_API_URL = 'https://api.astronomyapi.com/api/v2/studio/star-chart'
+
+# New endpoints for planetary positions and moon phase
+PLANETARY_POSITIONS_URL = "https://api.astronomyapi.com/api/v2/bodies/positions"
+MOON_PHASE_URL = "https://api.astronomyapi.com/api/v2/studio/moon-phase"
+
+# Constellation names shown in the UI mapped to their AstronomyAPI ids.
+CONSTELLATION_IDS = MappingProxyType({
+    "Andromeda": "and", "Aquarius": "aqr", "Aries": "ari", "Cancer": "cnc",
+    "Capricornus": "cap", "Gemini": "gem", "Leo": "leo", "Libra": "lib",
+    "Pisces": "psc", "Sagittarius": "sgr", "Scorpius": "sco", "Taurus": "tau", "Virgo": "vir"
+})
+CONSTELLATION_NAMES = tuple(CONSTELLATION_IDS)
+
+# Options accepted by the moon-phase endpoint; the first of each is the default.
+MOON_IMAGE_FORMATS = ("png", "svg")
+MOON_STYLES = ("default", "sketch", "shaded")
+MOON_BACKGROUND_STYLES = ("stars", "solid")
+MOON_ORIENTATIONS = ("north-up", "south-up")
+
+# Downloaded images and API responses are kept in size-limited stores on disk;
+# Streamlit's own disk persistence never evicts, so it isn't used for either.
+IMAGE_CACHE_DIR = ".image_cache"
+IMAGE_CACHE_SIZE_LIMIT = 256 * 1024 * 1024
+
+# Responses also expire, because charts and moon phases only carry a hosted
+# imageUrl, which must not outlive the host's copy of the image.
+RESPONSE_CACHE_DIR = ".astro_cache"
+RESPONSE_CACHE_SIZE_LIMIT = 64 * 1024 * 1024
+RESPONSE_CACHE_TTL_S = 86400
+
+# Observer coordinates are rounded to this many decimals (about 1 km) before they
+# reach a request, which is negligible for the sky but keeps cache keys stable.
+COORD_DECIMALS = 2
+
+def quantize_coord(value, ndigits=COORD_DECIMALS):
+    """
+    Round a latitude/longitude so that nearby inputs share cached responses.
+    """
+    return round(float(value), ndigits)
+
+# --- Basic Authentication Setup for AstronomyAPI ---
+# According to the AstronomyAPI docs (see https://docs.astronomyapi.com/studio/star-chart/request),
+# this endpoint uses Basic Auth. Credentials (app id:secret) are base64-encoded.
+@st.cache_resource
+def _auth_headers():
+    """
+    Build the AstronomyAPI request headers once per process.
+    Raises RuntimeError with a clear message if the credentials (or the secrets file)
+    are missing; this runs on pool threads, so the caller renders the error.
+    """
+    try:
+        app_id = st.secrets.get("astronomy_app_id")
+        app_secret = st.secrets.get("astronomy_api_key")
+    except StreamlitSecretNotFoundError:
+        app_id = app_secret = None
+    if not (app_id and app_secret):
+        raise RuntimeError("AstronomyAPI credentials are missing. Set astronomy_app_id and astronomy_api_key in your Streamlit secrets.")
+    encoded_credentials = base64.b64encode(f"{app_id}:{app_secret}".encode()).decode()
+    return {
+        "Authorization": f"Basic {encoded_credentials}",
+        "Content-Type": "application/json"
+    }
+
+@st.cache_resource
+def _response_store():
+    import diskcache
+    return diskcache.Cache(RESPONSE_CACHE_DIR, size_limit=RESPONSE_CACHE_SIZE_LIMIT)
+
+# --- Cached AstronomyAPI requests ---
+# Responses are keyed on the request's inputs (the positions params as a sorted
+# tuple), held in memory by st.cache_data and on disk in the response store.
+@st.cache_data(ttl=RESPONSE_CACHE_TTL_S, max_entries=256, show_spinner=False)
+def fetch_star_chart(latitude, longitude, date_str, constellation_id):
+    """
+    POST a star-chart request for one constellation and return the parsed JSON response.
+    """
+    store = _response_store()
+    key = ("star-chart", latitude, longitude, date_str, constellation_id)
+    cached = store.get(key)
+    if cached is not None:
+        return cached
+    payload = {
+        "style": "inverted",
+        "observer": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "date": date_str
+        },
+        "view": {
+            "type": "constellation",
+            "parameters": {
+                "constellation": constellation_id
+            }
+        }
+    }
+    # Increase the timeout because generating the star map can take time
+    res = http().post(ASTRONOMY_API_URL, headers=_auth_headers(), content=orjson.dumps(payload), timeout=120)
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    store.set(key, data, expire=RESPONSE_CACHE_TTL_S)
+    return data
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL_S, max_entries=64, show_spinner=False)
+def fetch_positions(params_tuple):
+    """
+    GET planetary positions for the given (key, value) params and return the parsed JSON response.
+    """
+    store = _response_store()
+    key = ("positions", params_tuple)
+    cached = store.get(key)
+    if cached is not None:
+        return cached
+    res = http().get(PLANETARY_POSITIONS_URL, headers=_auth_headers(), params=dict(params_tuple), timeout=120)
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    store.set(key, data, expire=RESPONSE_CACHE_TTL_S)
+    return data
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL_S, max_entries=256, show_spinner=False)
+def fetch_moon_phase(latitude, longitude, date_str, image_format, moon_style,
+                     background_style, background_color, orientation):
+    """
+    POST a moon-phase request and return the parsed JSON response.
+    background_color is only sent for a solid background.
+    """
+    store = _response_store()
+    key = ("moon-phase", latitude, longitude, date_str, image_format, moon_style,
+           background_style, background_color, orientation)
+    cached = store.get(key)
+    if cached is not None:
+        return cached
+    # Observer, style and view parameters for moon phase.
+    payload = {
+        "format": image_format,
+        "style": {
+            "moonStyle": moon_style,
+            "backgroundStyle": background_style,
+            # Only include backgroundColor if background is solid.
+            **({"backgroundColor": background_color} if background_style == "solid" else {})
+        },
+        "observer": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "date": date_str
+        },
+        "view": {
+            "type": "portrait-simple",
+            "orientation": orientation
+        }
+    }
+    res = http().post(MOON_PHASE_URL, headers=_auth_headers(), content=orjson.dumps(payload), timeout=120)
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    store.set(key, data, expire=RESPONSE_CACHE_TTL_S)
+    return data
+
+@st.cache_resource
+def _image_store():
+    import diskcache
+    return diskcache.Cache(IMAGE_CACHE_DIR, size_limit=IMAGE_CACHE_SIZE_LIMIT)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_image(url):
+    """
+    Download a generated image once so reruns don't depend on the hosted URL staying valid.
+    """
+    store = _image_store()
+    if url in store:
+        return store[url]
+    res = http().get(url, timeout=30)
+    res.raise_for_status()
+    store.set(url, res.content)
+    return res.content
@@ -0,0 +1,99 @@
+"""
+Shared HTTP plumbing used by the Google Places and AstronomyAPI helpers.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+__all__ = ["RETRY_STATUSES", "http", "run_parallel", "map_parallel", "submit"]
+
+# Transient failures (rate limits, 5xx) are retried with exponential backoff.
+# A request can narrow this set with the "retry_statuses" extension, e.g. when
+# its caller already retries some statuses itself.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_S = 0.3
+
+
+class _RetryTransport(httpx.HTTPTransport):
+    """
+    HTTP/2-capable transport that also retries transient error statuses;
+    httpx's own `retries` only covers failed connection attempts.
+    The AstronomyAPI POSTs only render images, so they are safe to retry too.
+    """
+    def handle_request(self, request):
+        retry_statuses = request.extensions.get("retry_statuses", RETRY_STATUSES)
+        for attempt in range(RETRY_ATTEMPTS + 1):
+            response = super().handle_request(request)
+            if response.status_code not in retry_statuses or attempt == RETRY_ATTEMPTS:
+                return response
+            response.close()
+            time.sleep(RETRY_BACKOFF_S * 2 ** attempt)
+
+
+@st.cache_resource
+def http():
+    """
+    Build a single HTTP/2 httpx.Client shared across reruns and users, so that
+    connections to Google, AstronomyAPI and its image host are reused and
+    concurrent requests to the same host are multiplexed over one connection.
+    """
+    limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    transport = _RetryTransport(http2=True, retries=3, limits=limits)
+    return httpx.Client(http2=True, transport=transport, timeout=120.0, follow_redirects=True)
+
+@st.cache_resource
+def _executor():
+    """
+    Bounded worker pool shared by all sessions for fanning out API requests.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+def map_parallel(fn, items):
+    """
+    Apply fn to every item on the shared worker pool and return the results in order.
+    Each task runs with this script run's context attached to its worker thread.
+    """
+    ctx = get_script_run_ctx()
+
+    def _run(item):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(item)
+
+    return list(_executor().map(_run, items))
+
+def _submit_to(executor, fn, *args):
+    ctx = get_script_run_ctx()
+
+    def _run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    return executor.submit(_run)
+
+def submit(fn, *args):
+    """
+    Start fn(*args) on the shared worker pool and return its Future.
+    The task runs with this script run's context attached to its worker thread.
+    """
+    return _submit_to(_executor(), fn, *args)
+
+@st.cache_resource
+def _interactive_executor():
+    """
+    Separate pool for run_parallel, so a request the user is waiting on never
+    queues behind another session's precompute fan-out or prefetches.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+def run_parallel(*calls):
+    """
+    Run independent blocking calls concurrently and return their results in order.
+    Each call is a tuple of (function, *args).
+    """
+    futures = [_submit_to(_interactive_executor(), fn, *args) for fn, *args in calls]
+    return [future.result() for future in futures]
@@ -0,0 +1,236 @@
+"""
+Google Places / Geocoding helpers: autocomplete, place details and address geocoding,
+rate limited and cached across reruns.
+"""
+import threading
+import time
+
+import httpx
+import streamlit as st
+
+from http_client import RETRY_STATUSES, http
+
+__all__ = ["TokenBucket", "get_place_suggestions", "get_place_details", "get_lati_longi"]
+
+# Client-side limits for Google Places / Geocoding calls shared by all sessions.
+PLACES_RATE_PER_S = 5
+PLACES_BURST = 10
+PLACES_MAX_RETRIES = 3
+PLACES_RETRY_BASE_S = 0.3
+PLACES_BACKOFF_S = 30
+PLACES_QUOTA_STATUSES = {"OVER_QUERY_LIMIT", "RESOURCE_EXHAUSTED"}
+# 429s are retried by _places_get alone, so the transport only retries 5xx for Google.
+PLACES_TRANSPORT_RETRY_STATUSES = RETRY_STATUSES - {429}
+PLACES_TIMEOUT_S = 10
+
+# Errors the public helpers degrade on: HTTP/status errors (RuntimeError), network
+# failures and timeouts (httpx.HTTPError) and malformed JSON bodies (ValueError).
+_LOOKUP_ERRORS = (RuntimeError, httpx.HTTPError, ValueError)
+
+# Resolved coordinates are also kept on disk so restarts and other workers don't
+# pay for them again. Google's terms allow caching lat/lng for up to 30 days.
+GEO_CACHE_DIR = ".geo_cache"
+GEO_CACHE_SIZE_LIMIT = 100 * 1024 * 1024
+GEO_CACHE_TTL_S = 30 * 86400
+
+# --- Rate limiting for Google Places ---
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second with bursts of up to `capacity`.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """
+        Consume a token if one is available; return whether it was.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+@st.cache_resource
+def _places_bucket():
+    return TokenBucket(rate=PLACES_RATE_PER_S, capacity=PLACES_BURST)
+
+class PlacesRateLimited(Exception):
+    """
+    Raised when Google keeps reporting an exhausted quota after all retries.
+    """
+
+def _places_get(url, params):
+    """
+    GET a Google Maps endpoint through the shared rate limiter.
+    Returns (status_code, data), where data is the parsed JSON body or None.
+    Quota errors are retried with short exponential backoff (0.3 s, 0.6 s, 1.2 s) before PlacesRateLimited is raised;
+    while this session is backing off it is raised straight away.
+    """
+    if _places_backing_off():
+        raise PlacesRateLimited("Google Places backoff in progress")
+    for attempt in range(PLACES_MAX_RETRIES + 1):
+        _places_bucket().acquire()
+        res = http().get(
+            url, params=params, timeout=PLACES_TIMEOUT_S,
+            extensions={"retry_statuses": PLACES_TRANSPORT_RETRY_STATUSES}
+        )
+        data = res.json() if res.status_code == 200 else None
+        limited = res.status_code == 429 or (data is not None and data.get("status") in PLACES_QUOTA_STATUSES)
+        if not limited:
+            return res.status_code, data
+        if attempt < PLACES_MAX_RETRIES:
+            time.sleep(PLACES_RETRY_BASE_S * 2 ** attempt)
+    raise PlacesRateLimited(f"Google Places quota exceeded ({url})")
+
+def _places_backing_off():
+    return time.monotonic() < st.session_state.get("_places_backoff_until", 0)
+
+def _start_places_backoff():
+    if _places_backing_off():
+        return
+    st.session_state["_places_backoff_until"] = time.monotonic() + PLACES_BACKOFF_S
+    st.warning("Location search is temporarily rate limited. Please try again in a moment.")
+
+@st.cache_resource
+def _geo_store():
+    import diskcache
+    return diskcache.Cache(GEO_CACHE_DIR, size_limit=GEO_CACHE_SIZE_LIMIT)
+
+# --- Functions for Google Places ---
+# The cached fetches raise on errors so that failures never end up in the cache.
+# The API key is passed as an underscore argument so Streamlit keeps it out of the cache key.
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _fetch_place_suggestions(user_input, _api_key):
+    url = 'https://maps.googleapis.com/maps/api/place/autocomplete/json'
+    params = {
+        "input": user_input,
+        "types": "geocode",
+        "key": _api_key
+    }
+    status_code, data = _places_get(url, params)
+    if status_code != 200:
+        raise RuntimeError(f"HTTP error: {status_code}")
+    if data.get("status") not in ("OK", "ZERO_RESULTS"):
+        raise RuntimeError(f"Place autocomplete error: {data.get('status')}")
+    suggestions = []
+    for item in data.get("predictions", []):
+        suggestions.append({
+            "description": item["description"],
+            "place_id": item["place_id"]
+        })
+    return suggestions
+
+def get_place_suggestions(api_key, user_input):
+    """
+    Fetch autocomplete suggestions from the Google Places Autocomplete API.
+    Returns a list of dictionaries with 'description' and 'place_id'.
+    The input is normalised so that e.g. "Sing" and "sing " share a cache entry.
+    """
+    user_input = user_input.strip().lower() if user_input else ""
+    if not user_input:
+        return []
+    try:
+        return _fetch_place_suggestions(user_input, api_key)
+    except PlacesRateLimited:
+        _start_places_backoff()
+    except _LOOKUP_ERRORS:
+        pass
+    return []
+
+# Coordinates for a place id don't change, so these are kept as long as Google allows.
+@st.cache_data(ttl=GEO_CACHE_TTL_S, max_entries=1024, show_spinner=False)
+def _fetch_place_details(place_id, _api_key):
+    store = _geo_store()
+    key = ("details", place_id)
+    if key in store:
+        return store[key]
+    url = 'https://maps.googleapis.com/maps/api/place/details/json'
+    params = {
+        'place_id': place_id,
+        'fields': 'geometry/location',
+        'key': _api_key
+    }
+    status_code, data = _places_get(url, params)
+    if status_code != 200:
+        raise RuntimeError(f"HTTP error: {status_code}")
+    if data.get('status') != 'OK':
+        raise RuntimeError(f"Place details error: {data.get('status')}")
+    location = data['result']['geometry']['location']
+    store.set(key, (location['lat'], location['lng']), expire=GEO_CACHE_TTL_S)
+    return location['lat'], location['lng']
+
+def get_place_details(api_key, place_id):
+    """
+    Fetch place details (latitude and longitude) using the Google Place Details API.
+    Returns (None, None) on failure.
+    """
+    try:
+        return _fetch_place_details(place_id, api_key)
+    except PlacesRateLimited:
+        _start_places_backoff()
+    except _LOOKUP_ERRORS as e:
+        st.error(str(e))
+    return None, None
+
+# Lookups that reach Google are stored on disk as well, so only the first
+# process to see an address pays for it.
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def _geocode(address, _api_key):
+    store = _geo_store()
+    key = ("geo", address)
+    if key in store:
+        return store[key]
+    url = 'https://maps.googleapis.com/maps/api/geocode/json'
+    params = {
+        "address": address,
+        "key": _api_key
+    }
+    status_code, data = _places_get(url, params)
+    if status_code != 200:
+        raise RuntimeError(f"HTTP error: {status_code}")
+    # Only a definite "no match" is cached; transient statuses raise and stay out of the cache.
+    if data["status"] == "ZERO_RESULTS" or (data["status"] == "OK" and not data["results"]):
+        return 0.0, 0.0
+    if data["status"] != "OK":
+        raise RuntimeError(f"Geocoding error: {data['status']}")
+    location = data["results"][0]["geometry"]["location"]
+    store.set(key, (location["lat"], location["lng"]), expire=GEO_CACHE_TTL_S)
+    return location["lat"], location["lng"]
+
+def get_lati_longi(api_key, address):
+    """
+    Geocode a free-text address with the Google Geocoding API.
+    Returns (0.0, 0.0) if the address could not be resolved and
+    (None, None) while Google is rate limiting us.
+    """
+    try:
+        return _geocode(address.strip().lower(), api_key)
+    except PlacesRateLimited:
+        _start_places_backoff()
+        return None, None
+    except _LOOKUP_ERRORS:
+        return 0.0, 0.0
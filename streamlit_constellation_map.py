@@ -1,90 +1,124 @@
 import streamlit as st
-from datetime import datetime, time as dtime
-import requests
-import base64
-import json
+from datetime import date, time as dtime
+import hashlib
+import logging
 import os
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import math
+import time
 import numpy as np
+import orjson
+from types import MappingProxyType
 from dotenv import load_dotenv
+from streamlit.errors import StreamlitSecretNotFoundError
+from http_client import *
+from places import *
+from astro_api import *
 
 
 # --- Configuration ---
 # Replace with your actual credentials and API key values.
 load_dotenv()
 
-#APP_ID = os.getenv("APP_ID")
-#APP_SECRET = os.getenv("APP_SECRET")
-#GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-APP_ID = st.secrets["astronomy_app_id"]
-APP_SECRET = st.secrets["astronomy_api_key"]
-GOOGLE_API_KEY = st.secrets["google_api_key"]
-ASTRONOMY_API_URL = 'https://api.astronomyapi.com/api/v2/studio/star-chart'
+logging.basicConfig(level=os.getenv("LOGLEVEL", "WARNING").upper())
+logger = logging.getLogger(__name__)
 
-# New endpoints for planetary positions and moon phase
-PLANETARY_POSITIONS_URL = "https://api.astronomyapi.com/api/v2/bodies/positions"
-MOON_PHASE_URL = "https://api.astronomyapi.com/api/v2/studio/moon-phase"
+# Default for the date pickers; evaluated once per script run.
+TODAY = date.today()
 
-# --- Functions for Google Places ---
-def get_place_suggestions(api_key, user_input):
+#GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+try:
+    GOOGLE_API_KEY = st.secrets["google_api_key"]
+except (StreamlitSecretNotFoundError, KeyError):
+    st.error("Google API key is missing. Set google_api_key in your Streamlit secrets.")
+    st.stop()
+
+# Columns kept from the flattened planetary-positions table, mapped to their short names.
+POSITION_COLUMNS = {
+    "entry.name": "name",
+    "date": "date",
+    "distance.fromEarth.au": "dist_au",
+    "distance.fromEarth.km": "dist_km",
+    "position.horizontal.altitude.degrees": "altitude_deg",
+    "position.horizontal.azimuth.degrees": "azimuth_deg",
+}
+FLOAT32_POSITION_COLUMNS = ["dist_au", "altitude_deg", "azimuth_deg"]
+
+# Marker colours for the polar plot.
+PLANET_COLORS = MappingProxyType({
+    "Sun":"#FFD700","Mercury":"#B0B0B0","Venus":"#EEDC82","Earth":"#2E8B57",
+    "Moon":"#F0F8FF","Mars":"#B22222","Jupiter":"#DAA520","Saturn":"#D2B48C",
+    "Uranus":"#87CEEB","Neptune":"#4169E1","Pluto":"#8B008B"
+})
+
+# Autocomplete only fires for reasonably specific input, and within the debounce
+# window only once the query has changed by at least AUTOCOMPLETE_MIN_EDITS characters.
+AUTOCOMPLETE_MIN_CHARS = 3
+AUTOCOMPLETE_DEBOUNCE_S = 0.3
+AUTOCOMPLETE_MIN_EDITS = 2
+AUTOCOMPLETE_RATE_PER_S = 5
+AUTOCOMPLETE_BURST = 5
+
+def _maybe_suggest(user_input):
     """
-    Fetch autocomplete suggestions from the Google Places Autocomplete API.
-    Returns a list of dictionaries with 'description' and 'place_id'.
+    Return autocomplete suggestions for the text box, skipping the Places call
+    for short input, for an unchanged query, or for a small edit made while the
+    user is still typing.
     """
-    if not user_input:
+    query = user_input.strip() if user_input else ""
+    if len(query) < AUTOCOMPLETE_MIN_CHARS:
         return []
-    url = 'https://maps.googleapis.com/maps/api/place/autocomplete/json'
-    params = {
-        "input": user_input,
-        "types": "geocode",
-        "key": api_key
-    }
-    res = requests.get(url, params=params)
-    suggestions = []
-    if res.status_code == 200:
-        data = res.json()
-        if data.get("status") == "OK":
-            for item in data["predictions"]:
-                suggestions.append({
-                    "description": item["description"],
-                    "place_id": item["place_id"]
-                })
+    last = st.session_state.get("_last_ac")
+    if last is not None and last[0] == query:
+        return last[1]
+    now = time.monotonic()
+    if last is not None:
+        # Length difference is a cheap lower bound on the edit distance.
+        edits = abs(len(query) - len(last[0]))
+        idle = now - st.session_state.get("_last_ac_ts", 0)
+        if edits < AUTOCOMPLETE_MIN_EDITS and idle < AUTOCOMPLETE_DEBOUNCE_S:
+            return last[1]
+    # Per-session token bucket so one fast typist can't burn the shared Places budget.
+    if "_ac_bucket" not in st.session_state:
+        st.session_state["_ac_bucket"] = TokenBucket(rate=AUTOCOMPLETE_RATE_PER_S, capacity=AUTOCOMPLETE_BURST)
+    if not st.session_state["_ac_bucket"].try_acquire():
+        return last[1] if last is not None else []
+    suggestions = get_place_suggestions(GOOGLE_API_KEY, query)
+    st.session_state["_last_ac"] = (query, suggestions)
+    st.session_state["_last_ac_ts"] = now
     return suggestions
 
-def get_place_details(api_key, place_id):
+def _memo_call(fetch, *args):
     """
-    Fetch place details (latitude and longitude) using the Google Place Details API.
+    Call one of the cached AstronomyAPI fetchers, reusing this session's last
+    result from it outright when the request is unchanged (e.g. a double click).
     """
-    url = 'https://maps.googleapis.com/maps/api/place/details/json'
-    params = {
-        'place_id': place_id,
-        'fields': 'geometry',
-        'key': api_key
-    }
-    res = requests.get(url, params=params)
-    if res.status_code == 200:
-        data = res.json()
-        if data.get('status') == 'OK':
-            location = data['result']['geometry']['location']
-            return location['lat'], location['lng']
-        else:
-            st.error(f"Place details error: {data.get('status')}")
-    else:
-        st.error(f"HTTP error: {res.status_code}")
-    return None, None
-
-# --- Basic Authentication Setup for AstronomyAPI ---
-# According to the AstronomyAPI docs (see https://docs.astronomyapi.com/studio/star-chart/request),
-# this endpoint uses Basic Auth. Credentials (APP_ID:APP_SECRET) are base64-encoded.
-credentials = f"{APP_ID}:{APP_SECRET}"
-encoded_credentials = base64.b64encode(credentials.encode()).decode()
-auth_headers = {
-    "Authorization": f"Basic {encoded_credentials}",
-    "Content-Type": "application/json"
-}
+    key = hashlib.blake2b(orjson.dumps(args, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+    memo = st.session_state.setdefault("_astro_memo", {})
+    last = memo.get(fetch.__name__)
+    if last is not None and last[0] == key:
+        return last[1]
+    result = fetch(*args)
+    memo[fetch.__name__] = (key, result)
+    return result
+
+def _moon_image(url, image_format):
+    """
+    Fetch a moon-phase image through the byte cache; st.image takes SVG as text.
+    """
+    image = fetch_image(url)
+    return image.decode() if image_format == "svg" else image
+
+def _query_coord(name):
+    """
+    Read a coordinate saved in the URL query string, defaulting to 0.0.
+    """
+    try:
+        return float(st.query_params.get(name, 0.0))
+    except ValueError:
+        return 0.0
 
 # --- Streamlit App Setup ---
 st.set_page_config(page_title="🌌 Constellation Viewer", layout="centered")
@@ -93,10 +127,78 @@ st.title("🔭 Constellation Viewer")
 planet_position_tab ,star_charts_tab, moon_phase_tab = st.tabs(["Planetary Positions", "Star Charts", "Moon Phase"])
 
 
+# --- Plot helpers ---
+_THETA = np.arange(361)
+
+@st.cache_resource
+def _orbit_rings():
+    """
+    Dotted reference rings drawn on the polar plot, built once per process.
+    """
+    return [
+        go.Scatterpolar(
+            r=np.full(361, radius, dtype=np.float32),
+            theta=_THETA,
+            mode="lines",
+            line_color="gray",
+            line_dash="dot",
+            showlegend=False,
+            hoverinfo="none"
+        )
+        for radius in (1, 5, 10, 20, 30)
+    ]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _base_polar(plot_df, subject):
+    """
+    Build the polar plot for the given positions once; callers only adjust the radial range.
+    Each call gets its own copy of the cached figure, so it is safe to modify.
+    """
+    # Build the figure *without* title
+    fig = px.scatter_polar(
+        plot_df,
+        r="relative_au",
+        theta="azimuth_deg",
+        color="name",
+        color_discrete_map=PLANET_COLORS,
+        hover_data=["name", "dist_au"],
+        template="plotly_dark"
+    )
+
+    # uniform markers + outline
+    fig.update_traces(
+        marker=dict(size=12, line=dict(width=1, color="white"))
+    )
+
+    # optional orbit rings
+    for ring in _orbit_rings():
+        fig.add_trace(ring)
+
+    # push legend and give extra top margin
+    fig.update_layout(
+        margin=dict(t=80, b=40, l=40, r=40),
+        polar=dict(
+            radialaxis=dict(title="Distance (AU)"),
+            angularaxis=dict(direction="clockwise", rotation=90, dtick=45),
+            bgcolor="rgba(0,0,0,0)"
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.1,   # just below the subheader
+            xanchor="center",
+            x=0.5,
+            title_text=""  # remove the little 'name' title
+        )
+    )
+    return fig
+
 # ============================================================
 # Tab 1: Planetary Positions
 # ============================================================
-with planet_position_tab:
+# Each tab is a fragment, so interacting with one tab only reruns that tab.
+@st.fragment
+def render_planet_positions():
     st.header("Planetary Positions")
     st.markdown(":green[Description]: Retrieve positions for all celestial bodies for a specified date range and observer's location. This data will be used to create a heliocentric (centered) polar plot.")
     
@@ -107,15 +209,15 @@ with planet_position_tab:
     with col2:
         pos_lng = st.number_input("Longitude", value=103.8198, key="pos_lng", format="%.4f")
     pos_elevation = st.number_input("Elevation (m)", value=0, key="pos_elev")
-    pos_from_date = st.date_input("From Date", value=datetime.today(), key="pos_from")
-    pos_to_date = st.date_input("To Date", value=datetime.today(), key="pos_to")
+    pos_from_date = st.date_input("From Date", value=TODAY, key="pos_from")
+    pos_to_date = st.date_input("To Date", value=TODAY, key="pos_to")
     pos_time = st.time_input("Time", value=dtime(9, 0), key="pos_time")
     
     if st.button("Get Positions", key="pos_button"):
         time_str = pos_time.strftime("%H:%M:%S")
         params = {
-            "latitude": pos_lat,
-            "longitude": pos_lng,
+            "latitude": quantize_coord(pos_lat),
+            "longitude": quantize_coord(pos_lng),
             "elevation": pos_elevation,
             "from_date": pos_from_date.strftime("%Y-%m-%d"),
             "to_date": pos_to_date.strftime("%Y-%m-%d"),
@@ -124,33 +226,20 @@ with planet_position_tab:
         }
         st.info("Requesting planetary positions from AstronomyAPI...")
         try:
-            pos_res = requests.get(PLANETARY_POSITIONS_URL, headers=auth_headers, params=params, timeout=120)
-            pos_res.raise_for_status()
-            pos_data = pos_res.json()
+            pos_data = _memo_call(fetch_positions, tuple(sorted(params.items())))
             
-            # Extract useful data from the JSON response
-            planet_data = []
+            # Flatten the JSON response into one row per (body, date) snapshot,
+            # keeping the first snapshot per body for the polar plot.
             planets_info = pos_data["data"]["table"]['rows']
-            for row in planets_info:
-                cells = row["cells"][0]  # assuming one cell per row for a single snapshot
-                date_str = cells["date"]
-                # Use the "entry" field for a reliable name.
-                name = row["entry"]["name"]
-                dist_au = float(cells["distance"]["fromEarth"]["au"])
-                dist_km = float(cells["distance"]["fromEarth"]["km"])
-                altitude_deg = float(cells["position"]["horizontal"]["altitude"]["degrees"])
-                azimuth_deg = float(cells["position"]["horizontal"]["azimuth"]["degrees"])
-                planet_data.append({
-                    "name": name,
-                    "date": date_str,
-                    "dist_au": dist_au,
-                    "dist_km": dist_km,
-                    "altitude_deg": altitude_deg,
-                    "azimuth_deg": azimuth_deg
-                })
-            
+            df = pd.json_normalize(planets_info, record_path="cells", meta=[["entry", "name"]])
+            # Use the "entry" field for a reliable name.
+            df = df.drop_duplicates("entry.name")[list(POSITION_COLUMNS)].rename(columns=POSITION_COLUMNS)
+            df["dist_km"] = pd.to_numeric(df["dist_km"])
+            # float32 is plenty for AU and degrees; km keeps float64 so the raw table stays exact.
+            df[FLOAT32_POSITION_COLUMNS] = df[FLOAT32_POSITION_COLUMNS].apply(pd.to_numeric, downcast="float")
+
             # Save the DataFrame in session state for later use
-            st.session_state.planet_pos_df = pd.DataFrame(planet_data)
+            st.session_state.planet_pos_df = df.reset_index(drop=True)
             st.success("Planetary positions retrieved successfully.")
             st.write("Raw Data:", st.session_state.planet_pos_df)
         except Exception as e:
@@ -172,9 +261,11 @@ with planet_position_tab:
                 subject = st.selectbox("Center Planet", df["name"].tolist(), key="pos_subject_simple")
 
                 # Compute relative_au for zoom slider
-                subject_au = df.loc[df["name"] == subject, "dist_au"].iloc[0]
-                df["relative_au"] = (df["dist_au"] - subject_au).abs()
-                df.loc[df["name"] == subject, "relative_au"] = 0
+                au = df["dist_au"].to_numpy(dtype=np.float32)
+                is_subject = df["name"].to_numpy() == subject
+                relative_au = np.abs(au - au[is_subject][0])
+                relative_au[is_subject] = 0.0
+                df["relative_au"] = relative_au
 
                 max_r = float(df["relative_au"].max())
                 zoom = st.slider(
@@ -185,58 +276,14 @@ with planet_position_tab:
             with visuals:
                 st.subheader("🪐 Heliocentric Polar Plot")
 
-                color_map = {
-                "Sun":"#FFD700","Mercury":"#B0B0B0","Venus":"#EEDC82","Earth":"#2E8B57",
-                "Moon":"#F0F8FF","Mars":"#B22222","Jupiter":"#DAA520","Saturn":"#D2B48C",
-                "Uranus":"#87CEEB","Neptune":"#4169E1","Pluto":"#8B008B"
-                }
-
-                # Build the figure *without* title
-                fig = px.scatter_polar(
-                    df,
-                    r="relative_au",
-                    theta="azimuth_deg",
-                    color="name",
-                    color_discrete_map=color_map,
-                    hover_data=["name", "dist_au"],
-                    template="plotly_dark"
-                )
-
-                # uniform markers + outline
-                fig.update_traces(
-                    marker=dict(size=12, line=dict(width=1, color="white"))
-                )
-
-                # optional orbit rings
-                for radius in [1, 5, 10, 20, 30]:
-                    fig.add_trace(go.Scatterpolar(
-                        r=[radius]*361,
-                        theta=list(range(361)),
-                        mode="lines",
-                        line_color="gray",
-                        line_dash="dot",
-                        showlegend=False,
-                        hoverinfo="none"
-                    ))
-
-                # push legend and give extra top margin
-                fig.update_layout(
-                    margin=dict(t=80, b=40, l=40, r=40),
-                    polar=dict(
-                        radialaxis=dict(range=[0, zoom], title="Distance (AU)"),
-                        angularaxis=dict(direction="clockwise", rotation=90, dtick=45),
-                        bgcolor="rgba(0,0,0,0)"
-                    ),
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.1,   # just below the subheader
-                        xanchor="center",
-                        x=0.5,
-                        title_text=""  # remove the little 'name' title
-                    )
+                # Only ship the columns the plot uses, as float32, to keep the figure JSON small
+                plot_df = df[["name", "relative_au", "azimuth_deg", "dist_au"]].astype(
+                    {"relative_au": "float32", "azimuth_deg": "float32", "dist_au": "float32"}
                 )
 
+                # Only the zoom changes between reruns, so apply it to the cached figure.
+                fig = _base_polar(plot_df, subject)
+                fig.update_layout(polar=dict(radialaxis=dict(range=[0, zoom])))
                 st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Please retrieve planetary positions first.")
@@ -245,22 +292,27 @@ with planet_position_tab:
 # ============================================================
 # Tab 2: Star Charts 
 # ============================================================
-with star_charts_tab:
+@st.fragment
+def render_star_charts():
     st.header("Star Charts")
     st.markdown(":green[Description]: Generate a star map for a specific constellation based on your location and date.")
 
     # --- Session State Initialization for Location ---
+    # A location saved in the URL by an earlier "Submit Location" seeds the
+    # session, so returning visitors don't need another Places lookup.
     if "latitude" not in st.session_state:
-        st.session_state.latitude = 0.0
+        st.session_state.latitude = _query_coord("lat")
     if "longitude" not in st.session_state:
-        st.session_state.longitude = 0.0
+        st.session_state.longitude = _query_coord("lng")
+    if "location_name" not in st.session_state:
+        st.session_state.location_name = st.query_params.get("loc")
     if "selected_place_id" not in st.session_state:
         st.session_state.selected_place_id = None
 
     # --- Location Form with Autocomplete ---
     with st.form("location_form", clear_on_submit=True):
         user_input = st.text_input("📍 Type a location (e.g. Singapore)")
-        suggestions = get_place_suggestions(GOOGLE_API_KEY, user_input) if user_input else []
+        suggestions = _maybe_suggest(user_input)
         if suggestions:
             options = {item["description"]: item["place_id"] for item in suggestions}
             selected_description = st.selectbox("Suggested Locations", list(options.keys()))
@@ -273,29 +325,24 @@ with star_charts_tab:
                 place_id = options[selected_description]
                 st.session_state.selected_place_id = place_id
                 lat, lng = get_place_details(GOOGLE_API_KEY, place_id)
-                if lat is not None and lng is not None:
-                    st.session_state.latitude = lat
-                    st.session_state.longitude = lng
+                # Only pay for a geocoding call when the details lookup failed.
+                if lat is None or lng is None:
+                    lat, lng = get_lati_longi(GOOGLE_API_KEY, selected_description)
             else:
                 # Fallback: use geocoding with the text input.
-                def get_lati_longi(api_key, address):
-                    url = 'https://maps.googleapis.com/maps/api/geocode/json'
-                    params = {
-                        "address": address,
-                        "key": api_key
-                    }
-                    response = requests.get(url, params=params)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data["status"] == "OK" and data["results"]:
-                            location = data["results"][0]["geometry"]["location"]
-                            return location["lat"], location["lng"]
-                    return 0.0, 0.0
                 lat, lng = get_lati_longi(GOOGLE_API_KEY, user_input)
+            if (lat, lng) == (0.0, 0.0):
+                # Geocoding found no match; keep the current location rather than saving 0,0.
+                st.warning("Couldn't find that location. Please try a different search.")
+            elif lat is not None and lng is not None:
                 st.session_state.latitude = lat
                 st.session_state.longitude = lng
+                st.session_state.location_name = selected_description
+                st.query_params.update(lat=lat, lng=lng, loc=selected_description)
 
     st.write("**Current Coordinates:**", st.session_state.latitude, st.session_state.longitude)
+    if st.session_state.location_name:
+        st.caption(f"📍 {st.session_state.location_name}")
 
     # --- User Inputs for Star Map ---
     col1, col2 = st.columns(2)
@@ -304,52 +351,51 @@ with star_charts_tab:
     with col2:
         longitude = st.number_input("Longitude", value=st.session_state.longitude, format="%.4f")
 
-    date = st.date_input("📅 Select date", value=datetime.today())
+    date = st.date_input("📅 Select date", value=TODAY)
+
+    constellation = st.selectbox("✨ Choose constellation", CONSTELLATION_NAMES, key="constellation")
 
-    constellation = st.selectbox("✨ Choose constellation", [
-        "Andromeda", "Aquarius", "Aries", "Cancer", "Capricornus", "Gemini",
-        "Leo", "Libra", "Pisces", "Sagittarius", "Scorpius", "Taurus", "Virgo"
-    ])
-    constellation_ids = {
-        "Andromeda": "and", "Aquarius": "aqr", "Aries": "ari", "Cancer": "cnc",
-        "Capricornus": "cap", "Gemini": "gem", "Leo": "leo", "Libra": "lib",
-        "Pisces": "psc", "Sagittarius": "sgr", "Scorpius": "sco", "Taurus": "tau", "Virgo": "vir"
-    }
+    precompute = st.checkbox(
+        "Precompute all constellations",
+        help="Fetch every constellation for this location and date at once, so switching between them is instant."
+    )
+    # Coordinates are rounded (~1 km) so tiny edits still hit the cached charts.
+    observer = (quantize_coord(latitude), quantize_coord(longitude), date.strftime("%Y-%m-%d"))
 
     # --- Generate Star Map ---
+    # A repeated click for the same chart is served by _memo_call and the fetch caches.
     if st.button("📷 Generate Star Map"):
-        payload = {
-            "style": "inverted",
-            "observer": {
-                "latitude": latitude,
-                "longitude": longitude,
-                "date": date.strftime("%Y-%m-%d")
-            },
-            "view": {
-                "type": "constellation",
-                "parameters": {
-                    "constellation": constellation_ids[constellation]
-                }
-            }
-        }
-
         st.info("Requesting your constellation map from AstronomyAPI...")
         try:
-            # Increase the timeout because generating the star map can take time
-            res = requests.post(ASTRONOMY_API_URL, headers=auth_headers, json=payload, timeout=120)
-            res.raise_for_status()
-            result = res.json()
-            # Pretty-print the JSON response for clarity
-            print(json.dumps(result, indent=4))
-            image_url = res.json()['data']['imageUrl']
-            st.image(image_url, caption=f"Constellation: {constellation}", use_container_width=True)
+            if precompute:
+                names = CONSTELLATION_NAMES
+                results = map_parallel(lambda name: fetch_star_chart(*observer, CONSTELLATION_IDS[name]), names)
+                st.session_state.star_chart_urls = {
+                    "observer": observer,
+                    "urls": {name: r['data']['imageUrl'] for name, r in zip(names, results)}
+                }
+                result = results[names.index(constellation)]
+            else:
+                result = _memo_call(fetch_star_chart, *observer, CONSTELLATION_IDS[constellation])
+            # Only formatted when LOGLEVEL=DEBUG
+            logger.debug("astro response: %s", result)
+            image_url = result['data']['imageUrl']
+            st.image(fetch_image(image_url), caption=f"Constellation: {constellation}", use_container_width=True)
+        except Exception as e:
+            st.error(f"Error: {e}")
+    elif st.session_state.get("star_chart_urls", {}).get("observer") == observer:
+        # Show the precomputed chart for the newly selected constellation straight away.
+        image_url = st.session_state.star_chart_urls["urls"][constellation]
+        try:
+            st.image(fetch_image(image_url), caption=f"Constellation: {constellation}", use_container_width=True)
         except Exception as e:
             st.error(f"Error: {e}")
 
 # ============================================================
 # Tab 3: Moon Phase
 # ============================================================
-with moon_phase_tab:
+@st.fragment
+def render_moon_phase():
     st.header("Moon Phase")
     st.markdown(":green[Description]: Generate an image of the moon phase using AstronomyAPI's POST endpoint.")
     
@@ -359,51 +405,76 @@ with moon_phase_tab:
         mp_lat = st.number_input("Latitude", value=st.session_state.latitude, key="mp_lat", format="%.4f")
     with col2:
         mp_lng = st.number_input("Longitude", value=st.session_state.longitude, key="mp_lng", format="%.4f")
-    mp_date = st.date_input("Select date", value=datetime.today(), key="mp_date")
+    mp_date = st.date_input("Select date", value=TODAY, key="mp_date")
+    mp_observer = (quantize_coord(mp_lat), quantize_coord(mp_lng), mp_date.strftime("%Y-%m-%d"))
     
     # Additional style configuration for Moon Phase (optional)
-    mp_format = st.selectbox("Image Format", options=["png", "svg"], index=0)
-    mp_moonStyle = st.selectbox("Moon Style", options=["default", "sketch", "shaded"], index=0)
-    mp_backgroundStyle = st.selectbox("Background Style", options=["stars", "solid"], index=0)
+    mp_format = st.selectbox("Image Format", options=MOON_IMAGE_FORMATS, index=0)
+    mp_moonStyle = st.selectbox("Moon Style", options=MOON_STYLES, index=0)
+    mp_backgroundStyle = st.selectbox("Background Style", options=MOON_BACKGROUND_STYLES, index=0)
     if mp_backgroundStyle == "solid":
         mp_backgroundColor = st.color_picker("Background Color", value="#000000")
     else:
         mp_backgroundColor = None
 
-    # Observer, style and view parameters for moon phase.
-    mp_payload = {
-        "format": mp_format,
-        "style": {
-            "moonStyle": mp_moonStyle,
-            "backgroundStyle": mp_backgroundStyle,
-            # Only include backgroundColor if background is solid.
-            **({"backgroundColor": mp_backgroundColor} if mp_backgroundStyle == "solid" else {})
-        },
-        "observer": {
-            "latitude": mp_lat,
-            "longitude": mp_lng,
-            "date": mp_date.strftime("%Y-%m-%d")
-        },
-        "view": {
-            "type": "portrait-simple",
-            # Optional: let user choose orientation
-            "orientation": st.selectbox("Orientation", options=["north-up", "south-up"], index=0)
-        }
-    }
+    # Optional: let user choose orientation
+    mp_orientation = st.selectbox("Orientation", options=MOON_ORIENTATIONS, index=0)
+    mp_request = (*mp_observer, mp_format, mp_moonStyle, mp_backgroundStyle, mp_backgroundColor, mp_orientation)
+
+    # Start downloading the moon phase in the background whenever the observer
+    # or date changes, so it is usually ready by the time the button is pressed.
+    # The first render only records the starting observer.
+    mp_prefetch = st.session_state.get("mp_prefetch")
+    if mp_prefetch is None:
+        st.session_state.mp_prefetch = (mp_observer, None, None)
+    elif mp_prefetch[0] != mp_observer:
+        st.session_state.mp_prefetch = (mp_observer, mp_request, submit(fetch_moon_phase, *mp_request))
     
     if st.button("Get Moon Phase", key="mp_button"):
         st.info("Requesting moon phase image from AstronomyAPI...")
         try:
-            mp_res = requests.post(MOON_PHASE_URL, headers=auth_headers, json=mp_payload, timeout=120)
-            mp_res.raise_for_status()
-            mp_data = mp_res.json()
+            _, prefetched_request, prefetched = st.session_state.mp_prefetch
+            mp_data = None
+            if prefetched_request == mp_request:
+                try:
+                    mp_data = prefetched.result(timeout=120)
+                except Exception:
+                    # A failed prefetch is dropped so this and later clicks make a fresh request.
+                    st.session_state.mp_prefetch = (mp_observer, None, None)
+            if mp_data is None:
+                mp_data = _memo_call(fetch_moon_phase, *mp_request)
             if "data" in mp_data and "imageUrl" in mp_data["data"]:
-                st.image(mp_data["data"]["imageUrl"], caption="Moon Phase", use_container_width=True)
+                st.image(_moon_image(mp_data["data"]["imageUrl"], mp_format), caption="Moon Phase", use_container_width=True)
             else:
-                st.write("Received data:", json.dumps(mp_data, indent=4))
+                st.write("Received data:", mp_data)
         except Exception as e:
             st.error(f"Error: {e}")
 
+    # Fetch the star map for the constellation chosen in the Star Charts tab
+    # together with this moon phase; the two requests run concurrently.
+    if st.button("Generate Star Map + Moon Phase", key="both_button"):
+        st.info("Requesting star map and moon phase from AstronomyAPI...")
+        try:
+            both_constellation = st.session_state.constellation
+            star_data, mp_data = run_parallel(
+                (fetch_star_chart, *mp_observer, CONSTELLATION_IDS[both_constellation]),
+                (fetch_moon_phase, *mp_request),
+            )
+            star_col, moon_col = st.columns(2)
+            with star_col:
+                st.image(fetch_image(star_data['data']['imageUrl']), caption=f"Constellation: {both_constellation}", use_container_width=True)
+            with moon_col:
+                st.image(_moon_image(mp_data["data"]["imageUrl"], mp_format), caption="Moon Phase", use_container_width=True)
+        except Exception as e:
+            st.error(f"Error: {e}")
+
+with planet_position_tab:
+    render_planet_positions()
+with star_charts_tab:
+    render_star_charts()
+with moon_phase_tab:
+    render_moon_phase()
+
 # === Footer ===
 st.markdown("---")
 st.caption("Made with ❤️ by Wilfred Djumin")
\ No newline at end of file